@@ -1,19 +1,31 @@
 #!/usr/bin/env python3
 import argparse
 import gzip
+import heapq
 import io
 import json
 import math
+import mmap
+import os
+import platform
 import re
-import sqlite3
+import shutil
+import subprocess
 import sys
 import tempfile
 import time
 import urllib.request
 from collections import defaultdict
-from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Iterator, Optional, Set, Tuple
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple
+
+try:
+    import rapidgzip  # optional: parallel gzip decompression
+except ImportError:  # stdlib-only fallback
+    rapidgzip = None
 
 
 # --- Progressbar & timers (stdlib-only) ---
@@ -40,10 +52,12 @@ class Progress:
     - Determinate (when total known) or indeterminate spinner (when total unknown).
     - 'compact' for a minimal, fast rendering.
     - Throttled redraws to avoid slow TTY updates.
+    - 'on_draw' runs right before each (throttled) redraw, e.g. to refresh 'extra' from counters the caller keeps.
     """
     SPINNER = "|/-\\"
 
-    def __init__(self, prefix: str = "", total: int | None = None, width: int = 10, min_interval: float = 0.25, compact: bool = False, ):
+    def __init__(self, prefix: str = "", total: int | None = None, width: int = 10, min_interval: float = 0.25, compact: bool = False,
+                 on_draw: Callable[[], None] | None = None, ):
         self.prefix = prefix
         self.total = total
         self.width = width
@@ -55,6 +69,7 @@ class Progress:
         self._spin_idx = 0
         self._done = False
         self.extra = ""  # extra text appended (e.g., "215k/s")
+        self.on_draw = on_draw
 
     def set_extra(self, text: str):
         self.extra = text
@@ -67,6 +82,8 @@ class Progress:
             self.last_draw = now
 
     def _draw(self, now: float):
+        if self.on_draw is not None:
+            self.on_draw()
         elapsed = now - self.start
         if self.total is not None and self.total > 0:
             ratio = min(1.0, self.count / self.total)
@@ -128,8 +145,12 @@ def shutil_get_terminal_width(default=120) -> int:
 # Helpers
 # ----------------------------
 
-OWNER_TOKEN_RE = re.compile(r"^\s*([^\s;]+)")
-ORIGIN_RE = re.compile(r"^\s*\$ORIGIN\s+([^\s;]+)")
+# Zone regexes run on raw bytes lines (no decode)
+OWNER_TOKEN_RE = re.compile(rb"^\s*([^\s;]+)")
+ORIGIN_RE = re.compile(rb"^\s*\$ORIGIN\s+([^\s;]+)")
+# Block kernel: owner token (plus the next token, for $-directives) of every line in one C-level scan
+ZONE_OWNER_RE = re.compile(rb"^[^\S\n]*([^\s;]+)", re.M)
+ZONE_OWNER_ARG_RE = re.compile(rb"^[^\S\n]*([^\s;]+)(?:[^\S\n]+([^\s;]+))?", re.M)
 TTL_RE = re.compile(r"^\s*\$TTL\b")
 COMMENT_OR_EMPTY_RE = re.compile(r"^\s*(;|$)")
 HTTP_URL_RE = re.compile(r"^https?://", re.I)
@@ -159,8 +180,27 @@ def normalize_fqdn(s: str) -> str:
     return s
 
 
-def is_relative(name: str) -> bool:
-    return not name.endswith(".")
+def make_sld_fn(tld: str) -> Callable[[str], Optional[str]]:
+    """
+    Build fqdn -> SLD for one TLD, with the TLD suffix precomputed once per file.
+    Only endswith/rfind/slicing per call: no split/join or list allocation.
+    The fqdn must already be lowercase (parsers lowercase the raw input once); a trailing dot is allowed.
+    """
+    dot_tld = "." + tld
+    tld_len = len(dot_tld)
+
+    def sld_of(fqdn: str) -> Optional[str]:
+        if fqdn.endswith("."):
+            fqdn = fqdn[:-1]
+        if not fqdn.endswith(dot_tld):
+            return None  # no tld match, or the tld apex itself
+        head = fqdn[:-tld_len]
+        if not head:
+            return None
+        i = head.rfind(".")
+        return (head if i == -1 else head[i + 1:]) + dot_tld
+
+    return sld_of
 
 
 def fqdn_to_sld(fqdn: str, tld: str) -> Optional[str]:
@@ -169,88 +209,113 @@ def fqdn_to_sld(fqdn: str, tld: str) -> Optional[str]:
     e.g., 'www.api.example.com' -> 'example.com'
           'foo.bar' (no tld match) -> None
           'com' (apex) -> None
-    This assumes the zone is exactly for the given TLD.
+    This assumes the zone is exactly for the given TLD and a lowercase fqdn (callers normalize).
+    Hot loops should build the function once via make_sld_fn(tld).
     """
-    fqdn = normalize_fqdn(fqdn)
-    labels = fqdn.split(".")
-    tld_labels = tld.split(".")
-    if len(labels) < len(tld_labels) + 1:
-        return None
-    if labels[-len(tld_labels):] != tld_labels:
-        return None
-    sld_label_index = -len(tld_labels) - 1
-    if abs(sld_label_index) > len(labels):
-        return None
-    sld = ".".join([labels[sld_label_index]] + tld_labels)
-    return sld
+    return make_sld_fn(tld)(fqdn)
+
+
+GZ_BUFFER_SIZE = 1 << 20  # the 8 KiB default read size starves the inflate loop
 
 
-def open_zone_file(path: Path) -> Iterable[str]:
-    """Open .txt, .gz, or .txt.gz as a text stream (utf-8 with replacement)."""
+@contextmanager
+def open_gz_binary(path: Path, threads: Optional[int] = None):
+    """
+    Yield (buffered binary stream, compressed_pos) for a .gz file, where compressed_pos()
+    returns the byte offset into the compressed file (for progress).
+    Uses rapidgzip's parallel decompression when installed (with 'threads' threads, default: all CPUs),
+    else stdlib gzip with a large read buffer.
+    """
+    with ExitStack() as stack:
+        if rapidgzip is not None:
+            raw = stack.enter_context(rapidgzip.RapidgzipFile(str(path), parallelization=threads or os.cpu_count() or 1))
+            comp_pos = lambda: raw.tell_compressed() // 8  # rapidgzip reports bits
+        else:
+            comp = stack.enter_context(path.open("rb"))
+            raw = stack.enter_context(gzip.GzipFile(fileobj=comp, mode="rb"))
+            comp_pos = comp.tell
+        yield io.BufferedReader(raw, buffer_size=GZ_BUFFER_SIZE), comp_pos
+
+
+def open_zone_file(path: Path) -> Iterable[bytes]:
+    """Open .txt, .gz, or .txt.gz and yield raw bytes lines (decoding is left to the parser)."""
     if path.suffix == ".gz" or path.name.endswith(".txt.gz"):
-        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as ftxt:
-            for line in ftxt:
-                yield line
+        with open_gz_binary(path) as (fb, _):
+            yield from fb
     else:
-        with path.open("r", encoding="utf-8", errors="replace") as f:
-            for line in f:
-                yield line
+        yield from _iter_lines_bytes_progress_txt(path, None)
 
 
-@contextmanager
-def domain_db(tmp_dir: Optional[Path] = None):
+def write_domains(domains: Set[str], out_path: Path) -> int:
     """
-    SQLite-backed 'set' for unique domains at large scale.
-    Uses a single table with UNIQUE(domain).
+    Sort the unique domains and write them to file with a determinate progress bar.
+    Rows go out as one joined buffer per 64k domains through os.write on a raw fd (no per-row IO calls).
     """
-    tmp_dir = tmp_dir or Path(tempfile.gettempdir())
-    db_path = tmp_dir / "domains_cache.sqlite3"
-    if db_path.exists():
-        db_path.unlink()
-    conn = sqlite3.connect(str(db_path))
+    ordered = sorted(domains)
+    pb = Progress(prefix=f"Writing {out_path.name}", total=len(ordered), compact=True)
+    step = 1 << 16
+    fd = os.open(str(out_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
     try:
-        cur = conn.cursor()
-        cur.executescript("""
-            PRAGMA journal_mode = WAL;
-            PRAGMA synchronous = OFF;
-            PRAGMA temp_store = MEMORY;
-            CREATE TABLE IF NOT EXISTS domains (
-                domain TEXT PRIMARY KEY,
-                tld    TEXT
-            );
-            """)
-        conn.commit()
-        yield conn
+        for i in range(0, len(ordered), step):
+            chunk = ordered[i:i + step]
+            view = memoryview(("\n".join(chunk) + "\n").encode("utf-8"))
+            while view:  # os.write may write partially
+                view = view[os.write(fd, view):]
+            pb.update(len(chunk))
     finally:
-        conn.close()
-        try:
-            db_path.unlink()
-        except Exception:
-            pass
+        os.close(fd)
+    pb.close()
+    return len(ordered)
+
+
+@contextmanager
+def spill_dir_for(dedup: str):
+    """Temp dir (removed afterwards) for spilled SLD runs in 'sort' dedup mode; None for in-memory dedup."""
+    if dedup != "sort":
+        yield None
+        return
+    with tempfile.TemporaryDirectory(prefix="domain_extractor_") as tmp:
+        yield Path(tmp)
+
 
+def _count_lines(path: Path) -> int:
+    n = 0
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            n += block.count(b"\n")
+    return n
 
-def batch_insert(conn: sqlite3.Connection, rows: Iterable[Tuple[str, str]]):
-    cur = conn.cursor()
-    cur.executemany("INSERT OR IGNORE INTO domains(domain, tld) VALUES(?, ?)", rows)
 
+def write_domains_external(parts: list[Path], out_path: Path, tmp_dir: Path) -> int:
+    """
+    Sort + dedup spilled SLD runs into out_path without holding them in memory.
+    Uses GNU sort -u (parallel merge; C locale so the order matches write_domains), else sorts each run
+    in memory (one zone file at a time) and k-way merges them with heapq.merge.
+    """
+    if not parts:
+        out_path.write_text("", encoding="utf-8")
+        return 0
+    sort_bin = shutil.which("sort") if os.name != "nt" else None
+    if sort_bin:
+        cmd = [sort_bin, "-u", f"--parallel={os.cpu_count() or 1}", "-S", "50%", "-T", str(tmp_dir), "-o", str(out_path)]
+        try:
+            subprocess.run(cmd + [str(p) for p in parts], check=True, env=dict(os.environ, LC_ALL="C"))
+            return _count_lines(out_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"[WARN] sort failed ({e}); merging in-process", file=sys.stderr)
 
-def dump_domains(conn: sqlite3.Connection, out_path: Path) -> int:
-    """Write domains to file with a determinate progress bar."""
-    cur = conn.cursor()
-    (n_total,) = cur.execute("SELECT COUNT(*) FROM domains").fetchone()
-    pb = Progress(prefix=f"Writing {out_path.name}", total=n_total, compact=True)
+    for p in parts:
+        p.write_text("".join(d + "\n" for d in sorted(set(p.read_text(encoding="utf-8").split()))), encoding="utf-8")
     total = 0
-    with out_path.open("w", encoding="utf-8") as out:
-        for (d,) in cur.execute("SELECT domain FROM domains ORDER BY domain ASC"):
-            out.write(d + "\n")
-            total += 1
-            if (total & 0x3FF) == 0:  # update every ~1024 rows
-                pb.update(1024)
-    # fix final increment if not multiple of 1024
-    remainder = n_total - (total - (total & 0x3FF))
-    if remainder > 0:
-        pb.update(remainder)
-    pb.close()
+    with ExitStack() as stack:
+        runs = [stack.enter_context(p.open("r", encoding="utf-8")) for p in parts]
+        out = stack.enter_context(out_path.open("w", encoding="utf-8", newline="\n"))
+        prev = None
+        for line in heapq.merge(*runs):
+            if line != prev:
+                out.write(line)
+                total += 1
+                prev = line
     return total
 
 
@@ -264,105 +329,200 @@ def read_lines(path: Path) -> Iterable[str]:
 # Bytes-based line iterators (deterministic per-file progress, throttled)
 # ----------------------------
 
-def _iter_lines_bytes_progress_txt(path: Path, pb: "Progress", min_bytes_step: int = 8 * 1024 * 1024, min_time_step: float = 0.25):
-    # Binary read so .tell() reports real bytes
+def _iter_blocks_bytes_progress_txt(path: Path, pb: Optional["Progress"], block_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    Yield newline-aligned blocks (~block_size bytes) of a plain-text file via mmap: direct page-cache access,
+    read-ahead hinted with MADV_SEQUENTIAL. The block offset doubles as byte progress, so no tell() calls.
+    """
     with path.open("rb") as fb:
-        with io.TextIOWrapper(fb, encoding="utf-8", errors="replace") as ftxt:
-            last_bytes = 0
-            last_t = time.perf_counter()
-            for line in ftxt:
-                now = time.perf_counter()
-                # sample only when enough time or bytes have passed
-                if (now - last_t) >= min_time_step:
-                    pos = fb.tell()
-                    delta = pos - last_bytes
-                    if delta >= min_bytes_step or (now - last_t) >= min_time_step:
-                        pb.update(delta)
-                        last_bytes = pos
-                        last_t = now
-                yield line
-            # final advance to eof
-            pos = fb.tell()
-            if pos > last_bytes:
-                pb.update(pos - last_bytes)
-
-
-def _iter_lines_bytes_progress_gz(path: Path, pb: "Progress", min_time_step: float = 0.25, ) -> Iterator[str]:
-    # Open in text mode; this returns a TextIOWrapper
-    with gzip.open(path, mode="rt", encoding="utf-8", errors="replace") as ftxt:
-        # Underlying gzip.GzipFile
-        gz = getattr(ftxt, "buffer", None)  # <- GzipFile
-        comp = getattr(gz, "fileobj", None) if gz is not None else None  # <- compressed file handle
-
-        last_bytes = 0
-        last_t = time.perf_counter()
-
-        for line in ftxt:
-            now = time.perf_counter()
-            if (now - last_t) >= min_time_step:
+        size = os.fstat(fb.fileno()).st_size
+        if size == 0:
+            return
+        try:
+            mm = mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # no usable mmap: buffered reads
+            yield from _iter_blocks_buffered(fb, pb, block_size)
+            return
+        with mm:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            pos = 0
+            while pos < size:
+                end = pos + block_size
+                if end >= size:
+                    end = size
+                else:
+                    nl = mm.rfind(b"\n", pos, end)
+                    if nl == -1:  # line longer than a block
+                        nl = mm.find(b"\n", end)
+                    end = nl + 1 if nl != -1 else size
+                yield mm[pos:end]
+                if pb is not None:
+                    pb.update(end - pos)
+                pos = end
+
+
+def _iter_blocks_buffered(fb, pb: Optional["Progress"], block_size: int = 1 << 20, comp_pos: Optional[Callable[[], int]] = None) -> Iterator[bytes]:
+    """
+    Yield newline-aligned blocks read from a binary stream; the partial last line is carried into the next block.
+    Progress is by bytes read, or by comp_pos() (compressed offset) when given.
+    """
+    tail = b""
+    last_bytes = 0
+    while True:
+        chunk = fb.read(block_size)
+        if not chunk:
+            break
+        nl = chunk.rfind(b"\n")
+        if nl == -1:
+            tail += chunk
+            continue
+        yield tail + chunk[:nl + 1] if tail else chunk[:nl + 1]
+        tail = chunk[nl + 1:]
+        if pb is not None:
+            if comp_pos is None:
+                last_bytes += len(chunk)
+                pb.update(len(chunk))
+            else:
                 try:
-                    pos = comp.tell() if comp is not None else last_bytes
+                    pos = comp_pos()
                 except OSError:
                     pos = last_bytes
-                delta = pos - last_bytes
-                if delta > 0:
-                    pb.update(delta)
+                if pos > last_bytes:
+                    pb.update(pos - last_bytes)
                     last_bytes = pos
-                last_t = now
-            yield line
-
+    if tail:
+        yield tail
+    if pb is not None and comp_pos is not None:
         # final advance
         try:
-            pos = comp.tell() if comp is not None else last_bytes
+            pos = comp_pos()
         except OSError:
             pos = last_bytes
         if pos > last_bytes:
             pb.update(pos - last_bytes)
 
 
-def parse_slds_from_lines(lines: Iterable[str], tld: str) -> Iterable[str]:
+def _iter_blocks_bytes_progress_gz(path: Path, pb: Optional["Progress"], block_size: int = 1 << 20,
+                                   gz_threads: Optional[int] = None) -> Iterator[bytes]:
+    # Newline-aligned decompressed blocks; progress follows the compressed stream position
+    with open_gz_binary(path, gz_threads) as (fb, comp_pos):
+        yield from _iter_blocks_buffered(fb, pb, block_size, comp_pos)
+
+
+def iter_zone_blocks(path: Path, pb: Optional["Progress"] = None, gz_threads: Optional[int] = None) -> Iterator[bytes]:
+    """Newline-aligned raw blocks of a .txt/.gz/.txt.gz zone file, with optional bytes progress."""
+    if path.suffix == ".gz" or path.name.endswith(".txt.gz"):
+        return _iter_blocks_bytes_progress_gz(path, pb, gz_threads=gz_threads)
+    return _iter_blocks_bytes_progress_txt(path, pb)
+
+
+def _iter_lines_bytes_progress_txt(path: Path, pb: Optional["Progress"], block_size: int = 1 << 20) -> Iterator[bytes]:
+    """Yield raw bytes lines (without newline) of a plain-text file; lines are split per mmap'd block in C."""
+    for block in _iter_blocks_bytes_progress_txt(path, pb, block_size):
+        lines = block.split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+        yield from lines
+
+
+def parse_slds_from_lines(lines: Iterable[bytes], tld: str) -> Iterable[str]:
     """
-    Fast-path parser: avoids regex except for $ORIGIN.
-    Yields SLDs (immediate child of TLD).
+    Fast-path parser over raw bytes lines: avoids regex except for $ORIGIN and
+    decodes only the owner token. Yields SLDs (immediate child of TLD).
     """
     origin = tld
+    sld_of = make_sld_fn(tld)
     for raw in lines:
         s = raw.lstrip()
-        if not s or s[0] == ';':  # comment/empty
-            continue
-        if s.startswith("$TTL"):
-            continue
-        if s.startswith("$ORIGIN"):
-            m_or = ORIGIN_RE.match(s)
-            if m_or:
-                origin = normalize_fqdn(m_or.group(1))
+        if s[0:1] in (b"", b";"):  # comment/empty
             continue
 
-        # FAST owner token: up to first whitespace or ';'
-        end = len(s)
-        semi = s.find(';')
+        # FAST owner token: up to first whitespace or ';' (both scans run in C)
+        semi = s.find(b";")
         if semi != -1:
-            end = semi  # drop inline comment
-        for i, ch in enumerate(s[:end]):
-            if ch.isspace():
-                end = i
-                break
-        if end == 0:
+            s = s[:semi]  # drop inline comment
+        token = s.split(None, 1)[0]
+        if token[0] == 0x24:  # '$' directive (rare): $ORIGIN moves the origin, $TTL & co. are skipped
+            m_or = ORIGIN_RE.match(s)
+            if m_or:
+                origin = normalize_fqdn(m_or.group(1).decode("utf-8", errors="replace"))
             continue
-        owner = s[:end]
+        owner = token.lower().decode("utf-8", errors="replace")
 
-        fqdn = origin if owner == "@" else (f"{owner}.{origin}" if is_relative(owner) else owner)
-        sld = fqdn_to_sld(fqdn, tld)
+        fqdn = origin if owner == "@" else (owner if owner.endswith(".") else f"{owner}.{origin}")
+        sld = sld_of(fqdn)
         if sld:
             yield sld
 
 
+def parse_slds_from_blocks(blocks: Iterable[bytes], tld: str) -> Iterator[list[str]]:
+    """
+    Block kernel with the same results as parse_slds_from_lines, yielding one list of SLDs per block.
+    Owner tokens of a whole block come from a single findall() (the line/whitespace scan runs in C);
+    the ORIGIN-aware variant only runs on blocks containing '$'. Per record:
+      - a repeat of the previous owner (several RRs per name) reuses the previous SLD;
+      - a relative owner under the zone apex maps to its last label + '.<tld>' without building the FQDN.
+    """
+    dot_tld = "." + tld
+    sld_of = make_sld_fn(tld)
+    origin = tld
+    prev = prev_sld = None
+    for block in blocks:
+        slds: list[str] = []
+        append = slds.append
+        block = block.lower()  # one C pass instead of a lower() per record
+        tokens = ZONE_OWNER_ARG_RE.findall(block) if b"$" in block else ZONE_OWNER_RE.findall(block)
+        for tok in tokens:
+            if tok.__class__ is tuple:
+                tok, arg = tok
+                if tok[0] == 0x24:  # '$' directive
+                    if tok == b"$origin" and arg:
+                        origin = normalize_fqdn(arg.decode("utf-8", errors="replace"))
+                    prev = None  # relative owners resolve differently now
+                    continue
+            if tok == prev:
+                if prev_sld:
+                    append(prev_sld)
+                continue
+            prev = tok
+            if origin == tld and tok[-1] != 0x2E and tok != b"@":
+                i = tok.rfind(b".")
+                sld = (tok[i + 1:] if i != -1 else tok).decode("utf-8", errors="replace") + dot_tld
+            else:
+                owner = tok.decode("utf-8", errors="replace")
+                sld = sld_of(origin if owner == "@" else (owner if owner.endswith(".") else f"{owner}.{origin}"))
+            prev_sld = sld
+            if sld:
+                append(sld)
+        yield slds
+
+
+def parse_slds_from_block_lines(blocks: Iterable[bytes], tld: str, batch: int = 1 << 16) -> Iterator[list[str]]:
+    """
+    parse_slds_from_lines over the lines of 'blocks', yielding lists of up to 'batch' SLDs
+    (drop-in for parse_slds_from_blocks). The per-line str.find/split loop is what PyPy's JIT compiles well.
+    """
+    slds = parse_slds_from_lines((line for block in blocks for line in block.split(b"\n")), tld)
+    while True:
+        chunk = list(islice(slds, batch))
+        if not chunk:
+            return
+        yield chunk
+
+
+# CPython: the findall() block kernel keeps the per-record work in C; PyPy: the JIT-friendly line loop
+IS_PYPY = platform.python_implementation() == "PyPy"
+_parse_slds = parse_slds_from_block_lines if IS_PYPY else parse_slds_from_blocks
+
+
 # ----------------------------
 # Blacklist fetching & parsing (stdlib urllib)
 # ----------------------------
 
-def fetch_text(url: str):
-    """Yield lines from a URL using only stdlib, with byte progress if Content-Length present."""
+def fetch_text(url: str, progress: bool = True):
+    """Yield lines from a URL using only stdlib, with byte progress if Content-Length present (and 'progress')."""
     req = urllib.request.Request(url, headers={"User-Agent": "zone-extractor/1.0"})
     with urllib.request.urlopen(req, timeout=60) as resp:
         total = None
@@ -371,23 +531,26 @@ def fetch_text(url: str):
         except Exception:
             total = None
 
-        pb = Progress(prefix=f"Downloading: {url}", total=total, compact=True)
-        buf = b""
-        for chunk in iter(lambda: resp.read(1 << 14), b""):
+        pb = Progress(prefix=f"Downloading: {url}", total=total, compact=True) if progress else None
+        # bytearray grows in place; only the trailing partial line is kept between chunks (linear, no re-copying)
+        buf = bytearray()
+        for chunk in iter(lambda: resp.read(1 << 18), b""):
             if not chunk:
                 break
-            pb.update(len(chunk))
-            buf += chunk
-            while True:
-                nl = buf.find(b"\n")
-                if nl == -1:
-                    break
-                line = buf[:nl].decode("utf-8", errors="replace").rstrip("\r\n")
-                buf = buf[nl + 1:]
-                yield line
+            if pb is not None:
+                pb.update(len(chunk))
+            buf.extend(chunk)
+            nl = buf.rfind(b"\n")
+            if nl == -1:
+                continue
+            lines = buf[:nl].decode("utf-8", errors="replace").split("\n")
+            del buf[:nl + 1]
+            for line in lines:
+                yield line.rstrip("\r")
         if buf:
             yield buf.decode("utf-8", errors="replace").rstrip("\r\n")
-        pb.close()
+        if pb is not None:
+            pb.close()
 
 
 def list_urls_from_firebog(index_url: str) -> set[str]:
@@ -431,46 +594,96 @@ def parse_hosts_line(line: str) -> Optional[str]:
     return dom
 
 
-def build_blacklist(sources: Iterable[str]) -> Set[str]:
+def _fetch_hosts_domains(url: str) -> Set[str]:
+    """Download one hosts list and parse it into a domain set (runs on a worker thread)."""
+    doms: Set[str] = set()
+    for line in fetch_text(url, progress=False):
+        dom = parse_hosts_line(line)
+        if dom:
+            doms.add(dom)
+    return doms
+
+
+def build_blacklist(sources: Iterable[str], workers: int = 32) -> Set[str]:
     """
     Download each source (hosts list) and collect domains into a set.
+    Sources are fetched concurrently on a thread pool (network-bound); results are merged on the calling thread.
     Shows a sources counter progress bar.
     """
     src_list = list(sources)
     pb = Progress(prefix="Building blacklist (sources)", total=len(src_list), compact=True)
     bl: Set[str] = set()
-    for src in src_list:
-        try:
-            for line in fetch_text(src):
-                dom = parse_hosts_line(line)
-                if dom:
-                    bl.add(dom)
-        except Exception as e:
-            print(f"[WARN] Failed to fetch {src}: {e}", file=sys.stderr)
-        finally:
-            pb.update(1)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(src_list)))) as ex:
+        futures = {ex.submit(_fetch_hosts_domains, src): src for src in src_list}
+        for fut in as_completed(futures):
+            try:
+                bl |= fut.result()
+            except Exception as e:
+                print(f"[WARN] Failed to fetch {futures[fut]}: {e}", file=sys.stderr)
+            finally:
+                pb.update(1)
     pb.close()
     return bl
 
 
-def suffix_blacklisted(domain: str, blacklist: Set[str]) -> bool:
+def build_blacklist_trie(domains: Iterable[str]) -> dict:
     """
-    True if 'domain' itself or any of its parent domains are in the blacklist.
+    Reverse-label trie over blacklisted domains: {'com': {'example': True}}.
+    A True leaf blocks the whole subtree, so entries below an already listed parent are dropped.
+    """
+    trie: dict = {}
+    for dom in domains:
+        node = trie
+        labels = dom.split(".")
+        for label in reversed(labels[1:]):
+            child = node.get(label)
+            if child is True:
+                break  # a parent is already listed
+            if child is None:
+                child = node[label] = {}
+            node = child
+        else:
+            node[labels[0]] = True
+    return trie
+
+
+def suffix_blacklisted(domain: str, bl_trie: dict) -> bool:
+    """
+    True if 'domain' itself or any of its parent domains are in the blacklist trie.
     e.g., blacklist has 'example.com' -> blocks 'example.com' and 'www.example.com'.
+    One dict probe per label, right-to-left; stops at the first miss.
     """
-    # exact match first
-    if domain in blacklist:
-        return True
-    # walk dots right-to-left, no allocations of full split list
-    i = domain.find(".")
-    while i != -1:
-        cand = domain[i + 1:]
-        if cand in blacklist:
+    labels = domain.split(".")
+    if len(labels) == 2:  # SLDs (what extract writes): TLD node, then one probe
+        node = bl_trie.get(labels[1])
+        return node is True or (node is not None and node.get(labels[0]) is True)
+    node = bl_trie
+    for label in reversed(labels):
+        node = node.get(label)
+        if node is None:
+            return False
+        if node is True:
             return True
-        i = domain.find(".", i + 1)
     return False
 
 
+def blocked_slds_for_tld(bl_trie: dict, tld: str) -> Optional[Set[str]]:
+    """
+    The blacklisted SLDs under one TLD as a small set, computed once per zone file, so checking an SLD
+    is a single probe into a cache-friendly set instead of a trie walk (most SLDs are not listed).
+    Returns None if the TLD itself (or a parent) is blacklisted, i.e. every SLD is blocked.
+    """
+    node = bl_trie
+    for label in reversed(tld.split(".")):
+        node = node.get(label)
+        if node is None:
+            return set()
+        if node is True:
+            return None
+    dot_tld = "." + tld
+    return {label + dot_tld for label, child in node.items() if child is True}
+
+
 # ----------------------------
 # Zone parsing (legacy generator kept; not used for bytes progress)
 # ----------------------------
@@ -481,36 +694,150 @@ def extract_domains_from_zone(path: Path, tld: str) -> Iterable[str]:
     Handles $ORIGIN for relative owners.
     """
     origin = tld  # default origin is the zone itself
+    sld_of = make_sld_fn(tld)
     for raw in open_zone_file(path):
         # superfast skips before regex:
         s = raw.lstrip()
-        if not s or s[0] == ';':  # comment/empty
+        if s[0:1] in (b"", b";"):  # comment/empty
             continue
-        if s.startswith("$TTL"):
+        m_own = OWNER_TOKEN_RE.match(s)
+        if not m_own:
             continue
-        if s.startswith("$ORIGIN"):
+        if s[0] == 0x24:  # '$' directive
             m_or = ORIGIN_RE.match(s)
             if m_or:
-                origin = normalize_fqdn(m_or.group(1))
+                origin = normalize_fqdn(m_or.group(1).decode("utf-8", errors="replace"))
             continue
-        m_own = OWNER_TOKEN_RE.match(s)
-        if not m_own:
-            continue
-        owner = m_own.group(1)
+        owner = m_own.group(1).lower().decode("utf-8", errors="replace")
         if owner == "@":
             fqdn = origin
         else:
-            fqdn = f"{owner}.{origin}" if is_relative(owner) else owner
-        sld = fqdn_to_sld(fqdn, tld)
+            fqdn = owner if owner.endswith(".") else f"{owner}.{origin}"
+        sld = sld_of(fqdn)
         if sld:
             yield sld
 
 
+# ----------------------------
+# Per-file zone processing (serial with bytes progress, or fanned out to worker processes)
+# ----------------------------
+
+def extract_zone(path: Path, tld: str, blocked: Optional[Set[str]], pb: Optional[Progress] = None,
+                 spill_path: Optional[Path] = None, gz_threads: Optional[int] = None) -> Tuple[Set[str], dict]:
+    """
+    Parse one zone file and return (kept SLDs, counts) where counts holds
+    extracted/kept/filtered/time_seconds. 'blocked' comes from blocked_slds_for_tld
+    (None: the whole TLD is blocked; empty: no filtering).
+    With 'pb', drive bytes progress plus a domains/sec extra (refreshed on the progress redraw cadence).
+    With 'spill_path', kept SLDs are written there (deduplicated per block only) and the returned set is empty.
+    'gz_threads' caps rapidgzip's decompression threads (default: all CPUs).
+    """
+    t0 = time.perf_counter()
+    kept_slds: Set[str] = set()
+    extracted = filtered = 0
+
+    def show_rate() -> None:
+        pb.set_extra(f"{fmt_rate(extracted / max(1e-9, time.perf_counter() - t0))}/s")
+
+    if pb is not None:
+        pb.on_draw = show_rate
+    tld_blocked = blocked is None
+
+    spill_buf: list[str] = []
+    add = kept_slds.add if spill_path is None else spill_buf.append
+    add_all = kept_slds.update if spill_path is None else spill_buf.extend
+    unfiltered = not tld_blocked and not blocked
+    with ExitStack() as stack:
+        spill = stack.enter_context(spill_path.open("w", encoding="utf-8", buffering=1 << 20)) if spill_path is not None else None
+        for slds in _parse_slds(iter_zone_blocks(path, pb, gz_threads), tld):
+            extracted += len(slds)
+            if unfiltered:
+                add_all(slds)
+            else:
+                for sld in slds:
+                    if tld_blocked or sld in blocked:
+                        filtered += 1
+                        continue
+                    add(sld)
+            if spill is not None and spill_buf:
+                spill.write("\n".join(dict.fromkeys(spill_buf)) + "\n")
+                spill_buf.clear()
+
+    if pb is not None:
+        pb.close()  # final redraw with rate
+
+    counts = {"extracted": extracted, "kept": extracted - filtered, "filtered": filtered, "time_seconds": time.perf_counter() - t0}
+    return kept_slds, counts
+
+
+def process_zone_files(files: list[Path], blacklist: dict, workers: int, spill_dir: Optional[Path] = None):
+    """
+    Extract (and optionally filter) SLDs from every zone file.
+    Returns (unique kept SLDs, per-TLD counts, per-TLD seconds).
+    workers <= 1 parses serially with bytes progress; otherwise files are parsed in parallel
+    (largest first) and progress is reported per completed file. 'blacklist' is a trie from
+    build_blacklist_trie (empty: no filtering); only each file's blocked SLD set is sent to a worker.
+    With 'spill_dir', each file's kept SLDs go to '<spill_dir>/<n>.slds' instead (see write_domains_external)
+    and the returned set is empty.
+    """
+    per_tld_counts = defaultdict(lambda: {"extracted": 0, "kept": 0, "filtered": 0})
+    tld_times: dict[str, float] = defaultdict(float)
+    seen: Set[str] = set()
+
+    jobs: list[Tuple[Path, str]] = []
+    for fp in files:
+        tld = get_tld_from_filename(fp)
+        if not tld:
+            print(f"[WARN] Could not infer TLD from filename: {fp.name}", file=sys.stderr)
+            continue
+        jobs.append((fp, tld))
+
+    def spill_for(idx: int) -> Optional[Path]:
+        return spill_dir / f"{idx:05d}.slds" if spill_dir is not None else None
+
+    def blocked_for(tld: str) -> Optional[Set[str]]:
+        return blocked_slds_for_tld(blacklist, tld) if blacklist else set()
+
+    def merge(tld: str, kept_slds: Set[str], counts: dict) -> None:
+        seen.update(kept_slds)
+        ctr = per_tld_counts[tld]
+        for k in ("extracted", "kept", "filtered"):
+            ctr[k] += counts[k]
+        tld_times[tld] += counts["time_seconds"]
+
+    if workers <= 1 or len(jobs) <= 1:
+        for idx, (fp, tld) in enumerate(jobs):
+            with timer(f"Processing {fp.name} (TLD={tld})"):
+                pb = Progress(prefix=f"Parsing {fp.name}", total=fp.stat().st_size, min_interval=0.25, compact=True)
+                kept_slds, counts = extract_zone(fp, tld, blocked_for(tld), pb, spill_for(idx))
+            merge(tld, kept_slds, counts)
+        return seen, per_tld_counts, tld_times
+
+    jobs.sort(key=lambda job: job[0].stat().st_size, reverse=True)
+    n_workers = min(workers, len(jobs))
+    gz_threads = max(1, (os.cpu_count() or 1) // n_workers)  # share the CPUs instead of n_workers x cpu_count threads
+    with timer(f"Processing {len(jobs)} zone files with {n_workers} workers"):
+        pb = Progress(prefix="Parsing zone files", total=len(jobs), min_interval=0.25, compact=True)
+        t0 = time.perf_counter()
+        extracted = 0
+        with ProcessPoolExecutor(max_workers=n_workers) as ex:
+            futures = {ex.submit(extract_zone, fp, tld, blocked_for(tld), None, spill_for(idx), gz_threads): tld for idx, (fp, tld) in enumerate(jobs)}
+            for fut in as_completed(futures):
+                kept_slds, counts = fut.result()
+                merge(futures[fut], kept_slds, counts)
+                extracted += counts["extracted"]
+                pb.set_extra(f"{fmt_rate(extracted / max(1e-9, time.perf_counter() - t0))}/s")
+                pb.update(1)
+        pb.close()
+    return seen, per_tld_counts, tld_times
+
+
 # ----------------------------
 # Main modes
 # ----------------------------
 
-def mode_extract_and_filter(folder: Path, out_file: Path, metrics_path: Path, include_adult: bool, include_nocross: bool) -> None:
+def mode_extract_and_filter(folder: Path, out_file: Path, metrics_path: Path, include_adult: bool, include_nocross: bool, workers: int = 1,
+                            dedup: str = "memory") -> None:
     files = sorted([p for p in folder.iterdir() if p.is_file() and (p.suffix in (".gz", ".txt") or p.name.endswith(".txt.gz"))])
     if not files:
         print(f"No .txt/.gz files found in {folder}", file=sys.stderr)
@@ -529,73 +856,20 @@ def mode_extract_and_filter(folder: Path, out_file: Path, metrics_path: Path, in
             print(f"[INFO] Index {idx} -> {len(urls)} sources")
             sources |= urls
         print(f"[INFO] Fetching {len(sources)} hosts lists for blacklist…")
-        blacklist = build_blacklist(sources)
-        print(f"[INFO] Blacklist domains loaded: {len(blacklist):,}")
-
-    # Process zones (bytes-based determinate progress per file)
-    per_tld_counts = defaultdict(lambda: {"extracted": 0, "kept": 0, "filtered": 0})
-    tld_times: dict[str, float] = defaultdict(float)
-
-    with domain_db() as conn:
-        batch: list[Tuple[str, str]] = []
-        BATCH_SIZE = 250_000
-
-        for fp in files:
-            tld = get_tld_from_filename(fp)
-            if not tld:
-                print(f"[WARN] Could not infer TLD from filename: {fp.name}", file=sys.stderr)
-                continue
-
-            t0 = time.perf_counter()
-            with timer(f"Processing {fp.name} (TLD={tld})"):
-                pb = Progress(prefix=f"Parsing {fp.name}", total=fp.stat().st_size, min_interval=0.25, compact=True)
-                extracted = kept = filtered = 0
-                rate_last_update = 0.0
-
-                # choose the correct byte-progress iterator
-                if fp.suffix == ".gz" or fp.name.endswith(".txt.gz"):
-                    line_iter = _iter_lines_bytes_progress_gz(fp, pb)
-                else:
-                    line_iter = _iter_lines_bytes_progress_txt(fp, pb)
-
-                for sld in parse_slds_from_lines(line_iter, tld):
-                    extracted += 1
-
-                    # compute and display domains/sec only on redraw cadence
-                    now = time.perf_counter()
-                    if now - rate_last_update >= 0.5:
-                        elapsed = max(1e-9, now - t0)
-                        pb.set_extra(f"{fmt_rate(extracted / elapsed)}/s")
-                        pb.update(0)  # just redraw
-                        rate_last_update = now
+        blacklist_domains = build_blacklist(sources)
+        print(f"[INFO] Blacklist domains loaded: {len(blacklist_domains):,}")
+        blacklist = build_blacklist_trie(blacklist_domains)
+        del blacklist_domains
 
-                    per_tld_counts[tld]["extracted"] += 1
-                    if suffix_blacklisted(sld, blacklist):
-                        filtered += 1
-                        per_tld_counts[tld]["filtered"] += 1
-                        continue
-                    kept += 1
-                    per_tld_counts[tld]["kept"] += 1
-                    batch.append((sld, tld))
-                    if len(batch) >= BATCH_SIZE:
-                        batch_insert(conn, batch)
-                        conn.commit()
-                        batch.clear()
-
-                # final redraw with rate
-                elapsed = max(1e-9, time.perf_counter() - t0)
-                pb.set_extra(f"{fmt_rate(extracted / elapsed)}/s")
-                pb.update(0)
-                pb.close()
-
-            tld_times[tld] += (time.perf_counter() - t0)
-
-        if batch:
-            batch_insert(conn, batch)
-            conn.commit()
+    # Process zones (bytes-based determinate progress per file, or per-file progress across workers)
+    with spill_dir_for(dedup) as spill_dir:
+        seen, per_tld_counts, tld_times = process_zone_files(files, blacklist, workers, spill_dir)
 
         with timer(f"Writing output {out_file.name}"):
-            total_written = dump_domains(conn, out_file)
+            if spill_dir is None:
+                total_written = write_domains(seen, out_file)
+            else:
+                total_written = write_domains_external(sorted(spill_dir.glob("*.slds")), out_file, spill_dir)
 
     # Metrics (add times and throughput)
     totals = {"extracted": 0, "kept": 0, "filtered": 0}
@@ -632,67 +906,20 @@ def mode_extract_and_filter(folder: Path, out_file: Path, metrics_path: Path, in
     print(f"Metrics JSON: {metrics_path}")
 
 
-def mode_extract_only(folder: Path, out_file: Path, metrics_path: Path) -> None:
+def mode_extract_only(folder: Path, out_file: Path, metrics_path: Path, workers: int = 1, dedup: str = "memory") -> None:
     files = sorted([p for p in folder.iterdir() if p.is_file() and (p.suffix in (".gz", ".txt") or p.name.endswith(".txt.gz"))])
     if not files:
         print(f"No .txt/.gz files found in {folder}", file=sys.stderr)
         sys.exit(1)
 
-    per_tld_counts = defaultdict(lambda: {"extracted": 0, "kept": 0, "filtered": 0})
-    tld_times: dict[str, float] = defaultdict(float)
-
-    with domain_db() as conn:
-        batch: list[Tuple[str, str]] = []
-        BATCH_SIZE = 250_000
-
-        for fp in files:
-            tld = get_tld_from_filename(fp)
-            if not tld:
-                print(f"[WARN] Could not infer TLD from filename: {fp.name}", file=sys.stderr)
-                continue
-
-            t0 = time.perf_counter()
-            with timer(f"Processing {fp.name} (TLD={tld})"):
-                pb = Progress(prefix=f"Parsing {fp.name}", total=fp.stat().st_size, min_interval=0.25, compact=True)
-                extracted = kept = 0
-                rate_last_update = 0.0
-
-                if fp.suffix == ".gz" or fp.name.endswith(".txt.gz"):
-                    line_iter = _iter_lines_bytes_progress_gz(fp, pb)
-                else:
-                    line_iter = _iter_lines_bytes_progress_txt(fp, pb)
-
-                for sld in parse_slds_from_lines(line_iter, tld):
-                    extracted += 1
-                    now = time.perf_counter()
-                    if now - rate_last_update >= 0.5:
-                        elapsed = max(1e-9, now - t0)
-                        pb.set_extra(f"{fmt_rate(extracted / elapsed)}/s")
-                        pb.update(0)
-                        rate_last_update = now
-
-                    per_tld_counts[tld]["extracted"] += 1
-                    per_tld_counts[tld]["kept"] += 1
-                    kept += 1
-                    batch.append((sld, tld))
-                    if len(batch) >= BATCH_SIZE:
-                        batch_insert(conn, batch)
-                        conn.commit()
-                        batch.clear()
-
-                elapsed = max(1e-9, time.perf_counter() - t0)
-                pb.set_extra(f"{fmt_rate(extracted / elapsed)}/s")
-                pb.update(0)
-                pb.close()
-
-            tld_times[tld] += (time.perf_counter() - t0)
-
-        if batch:
-            batch_insert(conn, batch)
-            conn.commit()
+    with spill_dir_for(dedup) as spill_dir:
+        seen, per_tld_counts, tld_times = process_zone_files(files, {}, workers, spill_dir)
 
         with timer(f"Writing output {out_file.name}"):
-            total_written = dump_domains(conn, out_file)
+            if spill_dir is None:
+                total_written = write_domains(seen, out_file)
+            else:
+                total_written = write_domains_external(sorted(spill_dir.glob("*.slds")), out_file, spill_dir)
 
     # Metrics (+times and throughput)
     totals = {"extracted": 0, "kept": 0, "filtered": 0}
@@ -744,63 +971,45 @@ def mode_filter_only(folder: Path, in_file: Path, out_file: Path, metrics_path:
             print(f"[INFO] Index {idx} -> {len(urls)} sources")
             sources |= urls
         print(f"[INFO] Fetching {len(sources)} hosts lists for blacklist…")
-        blacklist = build_blacklist(sources)
-        print(f"[INFO] Blacklist domains loaded: {len(blacklist):,}")
+        blacklist_domains = build_blacklist(sources)
+        print(f"[INFO] Blacklist domains loaded: {len(blacklist_domains):,}")
+        blacklist = build_blacklist_trie(blacklist_domains)
+        del blacklist_domains
 
-    per_tld_counts = defaultdict(lambda: {"extracted": 0, "kept": 0, "filtered": 0})
+    tld_counts = defaultdict(lambda: [0, 0])  # tld -> [extracted, filtered]
     t0_total = time.perf_counter()
 
-    def infer_tld(domain: str) -> str:
-        parts = domain.split(".")
-        return parts[-1] if len(parts) >= 2 else ""
+    seen: Set[str] = set()
 
-    with domain_db() as conn:
-        batch: list[Tuple[str, str]] = []
-        BATCH_SIZE = 250_000
+    with timer(f"Filtering {in_file.name}"):
+        processed = 0
+        t0 = time.perf_counter()
 
-        with timer(f"Filtering {in_file.name}"):
-            pb = Progress(prefix=f"Filtering {in_file.name}", total=in_file.stat().st_size, min_interval=0.25, compact=True)
-            processed = 0
-            rate_last = 0.0
-            t0 = time.perf_counter()
+        def show_rate() -> None:
+            pb.set_extra(f"{fmt_rate(processed / max(1e-9, time.perf_counter() - t0))}/s")
 
-            # bytes-progress for plain text input, throttled
-            for line in _iter_lines_bytes_progress_txt(in_file, pb):
-                domain = normalize_fqdn(line)
-                if not domain or "." not in domain:
-                    continue
-                processed += 1
-
-                now = time.perf_counter()
-                if now - rate_last >= 0.5:
-                    elapsed = max(1e-9, now - t0)
-                    pb.set_extra(f"{fmt_rate(processed / elapsed)}/s")
-                    pb.update(0)
-                    rate_last = now
-
-                tld = infer_tld(domain)
-                per_tld_counts[tld]["extracted"] += 1
-                if suffix_blacklisted(domain, blacklist):
-                    per_tld_counts[tld]["filtered"] += 1
-                    continue
-                per_tld_counts[tld]["kept"] += 1
-                batch.append((domain, tld))
-                if len(batch) >= BATCH_SIZE:
-                    batch_insert(conn, batch)
-                    conn.commit()
-                    batch.clear()
-
-            elapsed = max(1e-9, time.perf_counter() - t0)
-            pb.set_extra(f"{fmt_rate(processed / elapsed)}/s")
-            pb.update(0)
-            pb.close()
+        pb = Progress(prefix=f"Filtering {in_file.name}", total=in_file.stat().st_size, min_interval=0.25, compact=True, on_draw=show_rate)
 
-        if batch:
-            batch_insert(conn, batch)
-            conn.commit()
+        # bytes-progress for plain text input, throttled
+        for line in _iter_lines_bytes_progress_txt(in_file, pb):
+            domain = normalize_fqdn(line.decode("utf-8", errors="replace"))
+            if not domain or "." not in domain:
+                continue
+            processed += 1
 
-        with timer(f"Writing output {out_file.name}"):
-            total_written = dump_domains(conn, out_file)
+            ctr = tld_counts[domain[domain.rfind(".") + 1:]]
+            ctr[0] += 1
+            if suffix_blacklisted(domain, blacklist):
+                ctr[1] += 1
+                continue
+            seen.add(domain)
+
+        pb.close()  # final redraw with rate
+
+    per_tld_counts = {tld: {"extracted": e, "kept": e - f, "filtered": f} for tld, (e, f) in tld_counts.items()}
+
+    with timer(f"Writing output {out_file.name}"):
+        total_written = write_domains(seen, out_file)
 
     # Metrics (+throughput for totals; per-TLD time not measured here individually)
     totals = {"extracted": 0, "kept": 0, "filtered": 0}
@@ -856,6 +1065,10 @@ def parse_args():
                    help="Modes: '' or 1 = extract+filter (default), 'extract' or 2 = extract only, 'filter' or 3 = filter only.")
     p.add_argument("--output", type=Path, default=None, help="Output file path. Defaults depend on mode.")
     p.add_argument("--metrics", type=Path, default=None, help="Metrics JSON path (default: metrics.json in folder).")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Worker processes for parsing zone files (default: CPU count; 1 = serial with per-file bytes progress).")
+    p.add_argument("--dedup", choices=("memory", "sort"), default="memory",
+                   help="Extract modes: 'memory' = in-memory set (default); 'sort' = spill SLDs to temp files and run an external sort -u (low RAM).")
     p.add_argument("--include-adult", action="store_true", default=True, help="Include Firebog 'adult' lists.")
     p.add_argument("--no-include-adult", dest="include_adult", action="store_false", help="Exclude Firebog 'adult' lists.")
     p.add_argument("--include-nocross", action="store_true", default=True, help="Include Firebog 'nocross' lists.")
@@ -872,14 +1085,16 @@ def main():
 
     mode = normalize_mode(args.mode)
     metrics_path = args.metrics or (folder / "metrics.json")
+    workers = args.workers or os.cpu_count() or 1
 
     with timer("Total run"):
         if mode == "extract+filter":
             out_file = args.output or (folder / "domains.txt")
-            mode_extract_and_filter(folder, out_file, metrics_path, include_adult=args.include_adult, include_nocross=args.include_nocross)
+            mode_extract_and_filter(folder, out_file, metrics_path, include_adult=args.include_adult, include_nocross=args.include_nocross,
+                                    workers=workers, dedup=args.dedup)
         elif mode == "extract":
             out_file = args.output or (folder / "domains.txt")
-            mode_extract_only(folder, out_file, metrics_path)
+            mode_extract_only(folder, out_file, metrics_path, workers=workers, dedup=args.dedup)
         else:
             in_file = folder / "domains.txt"
             out_file = args.output or (folder / "domains_filtered.txt")
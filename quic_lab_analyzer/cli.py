@@ -30,13 +30,19 @@ def main() -> None:
         "--workers",
         type=int,
         default=None,
-        help="Number of worker processes for qlog parsing (default: CPU count).",
+        help="Number of worker processes for recorder, qlog and log parsing and plot rendering (default: CPU count).",
     )
     parser.add_argument(
         "--no-plots",
         action="store_true",
         help="Disable plot generation.",
     )
+    parser.add_argument(
+        "--plot-format",
+        choices=("png", "svg"),
+        default="png",
+        help="Image format for plots (default: png; svg is vector output and faster to write).",
+    )
 
     args = parser.parse_args()
 
@@ -56,18 +62,20 @@ def main() -> None:
     logging.info("Root: %s", root)
     logging.info("Output: %s", out_dir)
 
-    # 1) Recorder
-    recorder = RecorderAnalyzer()
+    workers = args.workers or os.cpu_count() or 1
+
+    # 1) Recorder (multiprocessing)
+    recorder = RecorderAnalyzer(workers=workers)
     recorder.process_directory(recorder_dir)
     recorder.write_summary(out_dir)
 
     # 2) QLOG (multiprocessing)
-    qlog = QlogAnalyzer(workers=args.workers or os.cpu_count() or 1)
+    qlog = QlogAnalyzer(workers=workers)
     qlog.process_directory(qlog_dir)
     qlog.write_summary(out_dir)
 
-    # 3) Rust logs
-    logs = LogAnalyzer()
+    # 3) Rust logs (multiprocessing)
+    logs = LogAnalyzer(workers=workers)
     logs.process_directory(log_dir)
     logs.write_summary(out_dir)
 
@@ -90,8 +98,10 @@ def main() -> None:
 
     # 5) Plots
     if not args.no_plots:
-        vis = Visualizer(out_dir)
+        vis = Visualizer(out_dir, workers=workers, fmt=args.plot_format)
         vis.plot_recorder(recorder)
         vis.plot_qlog(qlog)
         vis.plot_logs(logs)
         vis.plot_cross(cross_summary)
+        vis.flush()
+        vis.close()
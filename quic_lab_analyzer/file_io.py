@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import gzip
+import heapq
+import io
+import os
+from operator import itemgetter
+from pathlib import Path
+from typing import BinaryIO, List, Mapping, Optional, TextIO, Tuple
+
+import orjson
+
+try:
+    import rapidgzip  # optional: parallel gzip decompression
+except ImportError:
+    rapidgzip = None
+
+# Large reads keep the per-line iteration in C
+READ_BUFFER_SIZE = 1 << 20
+
+# rapidgzip decompression threads per opened file; all CPUs unless a worker pool shares them (share_gz_threads)
+_gz_threads: Optional[int] = None
+
+# Summary JSON via orjson: sorted keys, 2-space indent; non-str keys (bools, ints) become strings like json.dump does
+SUMMARY_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def list_input_files(directory: Path, prefix: str) -> List[Path]:
+    """Files in 'directory' whose name starts with 'prefix' (e.g. rotated logs), sorted by name."""
+    with os.scandir(directory) as it:
+        names = [e.name for e in it if e.name.startswith(prefix) and e.is_file()]
+    names.sort()
+    return [directory / name for name in names]
+
+
+def sorted_counts(counter: Mapping, top_k: Optional[int] = None, by_str: bool = True) -> List[Tuple]:
+    """
+    (key, count) pairs by descending count, ties by key (compared as str(key) when 'by_str'),
+    i.e. sorted(..., key=lambda x: (-x[1], key)) but as two stable sorts with C-level keys where possible.
+    With 'top_k', only the first top_k pairs are selected (O(n log k)).
+    """
+    items = list(counter.items())
+    if by_str and not all(key.__class__ is str for key in counter):
+        tie_key = lambda item: str(item[0])
+    else:
+        tie_key = itemgetter(0)
+    if top_k is not None:
+        return heapq.nsmallest(top_k, items, key=lambda item: (-item[1], tie_key(item)))
+    items.sort(key=tie_key)
+    items.sort(key=itemgetter(1), reverse=True)  # stable: equal counts keep key order
+    return items
+
+
+def share_gz_threads(n_workers: int) -> None:
+    """
+    Pool initializer: give each of 'n_workers' worker processes an equal share of the CPUs for rapidgzip,
+    instead of every worker decompressing with cpu_count threads.
+    """
+    global _gz_threads
+    _gz_threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+
+def open_binary(path: Path) -> BinaryIO:
+    """
+    Open an input file for binary line iteration, decompressing rotated `.gz` files on the fly
+    (rapidgzip when installed, else stdlib gzip).
+    """
+    if path.suffix == ".gz":
+        if rapidgzip is not None:
+            raw = rapidgzip.open(str(path), parallelization=_gz_threads or os.cpu_count() or 1)
+        else:
+            raw = gzip.open(path, "rb")
+        return io.BufferedReader(raw, buffer_size=READ_BUFFER_SIZE)
+
+    f = path.open("rb", buffering=READ_BUFFER_SIZE)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return f
+
+
+def open_text(path: Path, errors: str = "strict") -> TextIO:
+    """UTF-8 text view of open_binary(path)."""
+    return io.TextIOWrapper(open_binary(path), encoding="utf-8", errors=errors)
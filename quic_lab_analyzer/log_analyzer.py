@@ -2,15 +2,58 @@ from __future__ import annotations
 
 import logging
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import orjson
 from tqdm import tqdm
 
+from file_io import SUMMARY_JSON_OPTIONS, list_input_files, open_text, share_gz_threads, sorted_counts
+
+
+def _process_log_file(path_str: str) -> dict:
+    path = Path(path_str)
+    error_counts: Counter = Counter()
+    dns_error_counts: Counter = Counter()
+    connect_error_counts: Counter = Counter()
+
+    with open_text(path, errors="replace") as f:
+        for line in f:
+            # Lines keep their newline; the extracted messages are strip()ped below
+
+            # Every branch below needs one of these; most lines have neither
+            if "ERROR" not in line and " err:" not in line:
+                continue
+
+            if "ERROR: failed to lookup address information:" in line:
+                error_counts["dns_lookup"] += 1
+                msg = line.split("ERROR: failed to lookup address information:", 1)[1].strip()
+                dns_error_counts[msg] += 1
+                continue
+
+            if " connect " in line and " err:" in line:
+                error_counts["connect"] += 1
+                msg = line.split(" err:", 1)[1].strip()
+                connect_error_counts[msg] += 1
+                continue
+
+            if "ERROR" in line:
+                error_counts["other_error"] += 1
+
+    return {
+        "file": str(path),
+        "error_counts": error_counts,
+        "dns_error_counts": dns_error_counts,
+        "connect_error_counts": connect_error_counts,
+    }
+
 
 @dataclass
 class LogAnalyzer:
+    workers: int = 1
+
     error_counts: Counter = field(default_factory=Counter)
     dns_error_counts: Counter = field(default_factory=Counter)
     connect_error_counts: Counter = field(default_factory=Counter)
@@ -20,14 +63,27 @@ class LogAnalyzer:
             logging.warning("Log directory %s does not exist, skipping.", log_dir)
             return
 
-        files = sorted(log_dir.glob("quic-lab.log*"))
+        files = list_input_files(log_dir, "quic-lab.log")
         if not files:
             logging.warning("No log files found in %s", log_dir)
             return
 
-        logging.info("Processing %d log files ...", len(files))
-        for path in tqdm(files, desc="Log files"):
-            self.process_file(path)
+        logging.info(
+            "Processing %d log files with %d workers ...",
+            len(files),
+            self.workers,
+        )
+
+        if self.workers <= 1:
+            for path in tqdm(files, desc="Log files"):
+                self.process_file(path)
+        else:
+            n_workers = min(self.workers, len(files))
+            chunksize = max(1, len(files) // (n_workers * 4))
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=share_gz_threads, initargs=(n_workers,)) as ex:
+                results = ex.map(_process_log_file, [str(p) for p in files], chunksize=chunksize)
+                for res in tqdm(results, total=len(files), desc="Log files"):
+                    self._merge_result(res)
 
         logging.info(
             "Logs: %d DNS errors, %d connect errors",
@@ -36,25 +92,12 @@ class LogAnalyzer:
         )
 
     def process_file(self, path: Path) -> None:
-        with path.open("r", encoding="utf-8", errors="replace") as f:
-            for line in f:
-                self._process_line(line.rstrip("\n"))
-
-    def _process_line(self, line: str) -> None:
-        if "ERROR: failed to lookup address information:" in line:
-            self.error_counts["dns_lookup"] += 1
-            msg = line.split("ERROR: failed to lookup address information:", 1)[1].strip()
-            self.dns_error_counts[msg] += 1
-            return
-
-        if " connect " in line and " err:" in line:
-            self.error_counts["connect"] += 1
-            msg = line.split(" err:", 1)[1].strip()
-            self.connect_error_counts[msg] += 1
-            return
+        self._merge_result(_process_log_file(str(path)))
 
-        if "ERROR" in line:
-            self.error_counts["other_error"] += 1
+    def _merge_result(self, res: dict) -> None:
+        self.error_counts.update(res.get("error_counts") or {})
+        self.dns_error_counts.update(res.get("dns_error_counts") or {})
+        self.connect_error_counts.update(res.get("connect_error_counts") or {})
 
     def to_dict(self) -> dict:
         return {
@@ -66,11 +109,8 @@ class LogAnalyzer:
     def write_summary(self, out_dir: Path) -> None:
         out_dir.mkdir(parents=True, exist_ok=True)
 
-        import json
-
         summary_path = out_dir / "logs_summary.json"
-        with summary_path.open("w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        summary_path.write_bytes(orjson.dumps(self.to_dict(), option=SUMMARY_JSON_OPTIONS))
         logging.info("Wrote logs summary to %s", summary_path)
 
         self._write_counter_csv(
@@ -85,10 +125,10 @@ class LogAnalyzer:
             )
 
     @staticmethod
-    def _write_counter_csv(path: Path, counter: Counter, header: List[str]) -> None:
+    def _write_counter_csv(path: Path, counter: Counter, header: List[str], top_k: Optional[int] = None) -> None:
         if not counter:
             return
-        with path.open("w", encoding="utf-8") as f:
-            f.write(",".join(header) + "\n")
-            for key, count in sorted(counter.items(), key=lambda x: (-x[1], str(x[0]))):
-                f.write(f"{key},{count}\n")
+        lines = [",".join(header)]
+        lines.extend(f"{key},{count}" for key, count in sorted_counts(counter, top_k))
+        lines.append("")
+        path.write_text("\n".join(lines), encoding="utf-8")
@@ -2,19 +2,19 @@ from __future__ import annotations
 
 import json
 import logging
-from collections import Counter, defaultdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Any
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+import orjson
 from tqdm import tqdm
 
+from file_io import SUMMARY_JSON_OPTIONS, list_input_files, open_binary, share_gz_threads, sorted_counts
 
-def _extract_packet_size(event: dict) -> Optional[int]:
-    data = event.get("data") or {}
-    header = data.get("header") or {}
 
+def _packet_size_from(header: dict, data: dict) -> Optional[int]:
     for container in (header, data):
         for key in ("packet_size", "payload_length", "length"):
             val = container.get(key)
@@ -24,111 +24,178 @@ def _extract_packet_size(event: dict) -> Optional[int]:
     return None
 
 
+def _handle_packet(ev: dict, name: str, result: dict) -> None:
+    direction = "sent" if name == "quic:packet_sent" else "received"
+    data = ev.get("data") or {}
+    header = data.get("header") or {}
+
+    pkt_type = header.get("packet_type") or "<unknown>"
+    packet_type_counts = result["packet_type_counts"]
+    pkey = (direction, pkt_type)
+    packet_type_counts[pkey] = packet_type_counts.get(pkey, 0) + 1
+
+    # header.packet_size is the common case; otherwise probe the other fields in order
+    size = header.get("packet_size")
+    if not isinstance(size, int):
+        size = _packet_size_from(header, data) or 0
+
+    if direction == "sent":
+        result["total_bytes_sent"] += size
+    else:
+        result["total_bytes_received"] += size
+
+    # Frame types
+    frames = data.get("frames") or []
+    if isinstance(frames, list):
+        frame_type_counts = result["frame_type_counts"]
+        for fr in frames:
+            if not isinstance(fr, dict):
+                continue
+            ft = fr.get("frame_type")
+            if ft is None:
+                continue
+            frame_type_counts[ft] = frame_type_counts.get(ft, 0) + 1
+
+
+def _handle_parameters_set(ev: dict, name: str, result: dict) -> None:
+    # Transport parameters (server side)
+    data = ev.get("data") or {}
+    if data.get("owner") != "remote":
+        return
+    transport_param_counts = result["transport_param_counts"]
+    for key, val in data.items():
+        if key in ("owner",):
+            continue
+        if val is None:
+            continue
+        if isinstance(val, (bool, int, float, str)):
+            v_key: Any = val
+        else:
+            v_key = str(val)
+        counts = transport_param_counts.get(key)
+        if counts is None:
+            counts = transport_param_counts[key] = {}
+        counts[v_key] = counts.get(v_key, 0) + 1
+
+
+# Per-name handlers; every other event only feeds the name-level counters
+_EVENT_HANDLERS = {
+    "quic:packet_sent": _handle_packet,
+    "quic:packet_received": _handle_packet,
+    "quic:parameters_set": _handle_parameters_set,
+}
+
+EventHandler = Callable[[dict, str, dict], None]
+
+# name -> (is_error, is_path, handler); qlog event names are a small vocabulary, so each is classified once per process
+_EVENT_NAME_INFO: Dict[str, Tuple[bool, bool, Optional[EventHandler]]] = {}
+
+
+def _classify_event_name(name: str) -> Tuple[bool, bool, Optional[EventHandler]]:
+    lname = name.lower()
+    is_error = "error" in lname or "closed" in lname or "connection_lost" in lname
+    info = (is_error, name.startswith("quic:path_"), _EVENT_HANDLERS.get(name))
+    _EVENT_NAME_INFO[name] = info
+    return info
+
+
 def _process_qlog_file(path_str: str) -> dict:
     path = Path(path_str)
-    result = {
+    result: Dict[str, Any] = {
         "file": str(path),
         "total_events": 0,
         "invalid_events": 0,
-        "event_name_counts": Counter(),
-        "packet_type_counts": Counter(),  # key: (direction, packet_type)
-        "frame_type_counts": Counter(),
-        "path_event_counts": Counter(),
-        "error_event_counts": Counter(),
-        "transport_param_counts": defaultdict(Counter),  # param_name -> Counter(value)
+        # Plain dicts (cheaper increments than Counter); _merge_result folds them into Counters
+        "event_name_counts": {},
+        "packet_type_counts": {},  # key: (direction, packet_type)
+        "frame_type_counts": {},
+        "path_event_counts": {},
+        "error_event_counts": {},
+        "transport_param_counts": {},  # param_name -> {value: count}
         "group_ids": set(),
         "total_bytes_sent": 0,
         "total_bytes_received": 0,
     }
 
-    with path.open("r", encoding="utf-8", errors="replace") as f:
+    # Hot-loop locals
+    total_events = invalid_events = 0
+    add_group_id = result["group_ids"].add
+    event_name_counts = result["event_name_counts"]
+    path_event_counts = result["path_event_counts"]
+    error_event_counts = result["error_event_counts"]
+    name_info_get = _EVENT_NAME_INFO.get
+    loads = orjson.loads
+
+    with open_binary(path) as f:
         for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("\x1e"):
+            # JSON-SEQ: records start with an RS byte; orjson skips the surrounding whitespace itself
+            if line[:1] == b"\x1e":
                 line = line[1:]
-            if not line:
-                continue
 
             try:
-                ev = json.loads(line)
-            except json.JSONDecodeError:
-                result["invalid_events"] += 1
-                continue
+                ev = loads(line)
+            except orjson.JSONDecodeError:
+                if not line.strip():
+                    continue
+                try:
+                    # orjson rejects invalid UTF-8; keep such events like the text decoder did
+                    ev = json.loads(line.decode("utf-8", errors="replace"))
+                except json.JSONDecodeError:
+                    invalid_events += 1
+                    continue
 
-            result["total_events"] += 1
+            total_events += 1
 
             group_id = ev.get("group_id")
             if isinstance(group_id, str):
-                result["group_ids"].add(group_id)
+                add_group_id(group_id)
 
             name = ev.get("name")
             if not isinstance(name, str):
                 continue
 
-            result["event_name_counts"][name] += 1
-
-            lname = name.lower()
-            if "error" in lname or "closed" in lname or "connection_lost" in lname:
-                result["error_event_counts"][name] += 1
-            if name.startswith("quic:path_"):
-                result["path_event_counts"][name] += 1
-
-            # Packet-level analysis
-            if name in ("quic:packet_sent", "quic:packet_received"):
-                direction = "sent" if name.endswith("sent") else "received"
-                data = ev.get("data") or {}
-                header = data.get("header") or {}
-
-                pkt_type = header.get("packet_type") or "<unknown>"
-                result["packet_type_counts"][(direction, pkt_type)] += 1
-
-                size = _extract_packet_size(ev)
-                if size is None:
-                    size = 0
-
-                if direction == "sent":
-                    result["total_bytes_sent"] += size
-                else:
-                    result["total_bytes_received"] += size
-
-                # Frame types
-                frames = data.get("frames") or []
-                if isinstance(frames, list):
-                    for fr in frames:
-                        if not isinstance(fr, dict):
-                            continue
-                        ft = fr.get("frame_type")
-                        if ft is None:
-                            continue
-                        result["frame_type_counts"][ft] += 1
-
-            # Transport parameters (server side)
-            if name == "quic:parameters_set":
-                data = ev.get("data") or {}
-                if data.get("owner") != "remote":
-                    continue
-                for key, val in data.items():
-                    if key in ("owner",):
-                        continue
-                    if val is None:
-                        continue
-                    if isinstance(val, (bool, int, float, str)):
-                        v_key: Any = val
-                    else:
-                        v_key = str(val)
-                    result["transport_param_counts"][key][v_key] += 1
-
-    # Convert sets/defaultdict for pickling
-    result["group_ids"] = list(result["group_ids"])
-    result["transport_param_counts"] = {
-        k: dict(v) for k, v in result["transport_param_counts"].items()
-    }
+            event_name_counts[name] = event_name_counts.get(name, 0) + 1
+
+            info = name_info_get(name)
+            if info is None:
+                info = _classify_event_name(name)
+            is_error, is_path, handler = info
+            if is_error:
+                error_event_counts[name] = error_event_counts.get(name, 0) + 1
+            if is_path:
+                path_event_counts[name] = path_event_counts.get(name, 0) + 1
+
+            if handler is not None:
+                handler(ev, name, result)
+
+    result["total_events"] = total_events
+    result["invalid_events"] = invalid_events
 
     return result
 
 
+def _add_counts(dst: dict, src: dict) -> None:
+    for key, count in src.items():
+        dst[key] = dst.get(key, 0) + count
+
+
+def _process_qlog_file_batch(path_strs: List[str]) -> dict:
+    """Parse several qlog files in one task and return a single pre-merged result (less to pickle)."""
+    merged: dict = {"files": len(path_strs), "transport_param_counts": {}}
+    group_ids: Set[str] = set()
+    for path_str in path_strs:
+        res = _process_qlog_file(path_str)
+        group_ids.update(res["group_ids"])
+        for key in ("total_events", "invalid_events", "total_bytes_sent", "total_bytes_received"):
+            merged[key] = merged.get(key, 0) + res[key]
+        for key in ("event_name_counts", "packet_type_counts", "frame_type_counts", "path_event_counts", "error_event_counts"):
+            _add_counts(merged.setdefault(key, {}), res[key])
+        for param, counts in res["transport_param_counts"].items():
+            _add_counts(merged["transport_param_counts"].setdefault(param, {}), counts)
+    merged["group_ids"] = group_ids
+    return merged
+
+
 @dataclass
 class QlogAnalyzer:
     workers: int = 1
@@ -150,7 +217,7 @@ class QlogAnalyzer:
             logging.warning("QLOG directory %s does not exist, skipping.", qlog_dir)
             return
 
-        files = sorted(qlog_dir.glob("quic-lab.sqlog*"))
+        files = list_input_files(qlog_dir, "quic-lab.sqlog")
         if not files:
             logging.warning("No qlog files found in %s", qlog_dir)
             return
@@ -166,11 +233,16 @@ class QlogAnalyzer:
                 res = _process_qlog_file(str(path))
                 self._merge_result(res)
         else:
-            with ProcessPoolExecutor(max_workers=self.workers) as ex:
-                futures = {ex.submit(_process_qlog_file, str(p)): p for p in files}
-                for fut in tqdm(as_completed(futures), total=len(files), desc="QLOG files"):
-                    res = fut.result()
+            # Each task parses a batch of files and returns one pre-merged result,
+            # so the pickled payload and the merges here scale with the batch count
+            n_workers = min(self.workers, len(files))
+            n_batches = min(len(files), n_workers * 4)
+            batches = [[str(p) for p in files[i::n_batches]] for i in range(n_batches)]
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=share_gz_threads, initargs=(n_workers,)) as ex, \
+                    tqdm(total=len(files), desc="QLOG files") as pbar:
+                for res in ex.map(_process_qlog_file_batch, batches):
                     self._merge_result(res)
+                    pbar.update(res["files"])
 
         logging.info(
             "QLOG: %d valid events, %d invalid events, %d unique group_ids",
@@ -220,11 +292,8 @@ class QlogAnalyzer:
     def write_summary(self, out_dir: Path) -> None:
         out_dir.mkdir(parents=True, exist_ok=True)
 
-        import json
-
         summary_path = out_dir / "qlog_summary.json"
-        with summary_path.open("w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        summary_path.write_bytes(orjson.dumps(self.to_dict(), option=SUMMARY_JSON_OPTIONS))
         logging.info("Wrote qlog summary to %s", summary_path)
 
         self._write_counter_csv(
@@ -255,16 +324,15 @@ class QlogAnalyzer:
             counter: Counter,
             header: List[str],
             is_pair: bool = False,
+            top_k: Optional[int] = None,
     ) -> None:
         if not counter:
             return
-        with path.open("w", encoding="utf-8") as f:
-            f.write(",".join(header) + "\n")
-            if is_pair:
-                for (direction, pkt_type), count in sorted(
-                        counter.items(), key=lambda x: (-x[1], str(x[0]))
-                ):
-                    f.write(f"{direction},{pkt_type},{count}\n")
-            else:
-                for key, count in sorted(counter.items(), key=lambda x: (-x[1], str(x[0]))):
-                    f.write(f"{key},{count}\n")
+        items = sorted_counts(counter, top_k)
+        lines = [",".join(header)]
+        if is_pair:
+            lines.extend(f"{direction},{pkt_type},{count}" for (direction, pkt_type), count in items)
+        else:
+            lines.extend(f"{key},{count}" for key, count in items)
+        lines.append("")
+        path.write_text("\n".join(lines), encoding="utf-8")
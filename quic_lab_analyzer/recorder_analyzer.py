@@ -4,17 +4,85 @@ import json
 import logging
 import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Set
+from typing import Any, Dict, Optional, Set
 
+import orjson
 from tqdm import tqdm
 
+from file_io import SUMMARY_JSON_OPTIONS, list_input_files, open_binary, share_gz_threads, sorted_counts
+
 ERROR_CODE_RE = re.compile(r"error_code=(\d+)")
 
 
+def _process_recorder_file(path_str: str) -> dict:
+    path = Path(path_str)
+    result: Dict[str, Any] = {
+        "file": str(path),
+        "total_records": 0,
+        "handshake_ok_counts": Counter(),
+        "enable_multipath_counts": Counter(),
+        "alpn_counts": Counter(),
+        "peer_close_error_codes": Counter(),
+        "local_close_error_codes": Counter(),
+        "group_ids": set(),
+    }
+
+    with open_binary(path) as f:
+        for line in f:
+            # Raw bytes straight into orjson; blank and malformed lines both fail here
+            try:
+                rec = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                if not line.strip():
+                    continue
+                try:
+                    # orjson rejects NaN/Infinity, which json.loads accepts; only lines both reject are skipped
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+
+            key = rec.get("key")
+            if isinstance(key, str):
+                result["group_ids"].add(key)
+
+            value = rec.get("value") or {}
+            result["total_records"] += 1
+
+            # handshake_ok
+            result["handshake_ok_counts"][value.get("handshake_ok", None)] += 1
+
+            # enable_multipath
+            result["enable_multipath_counts"][value.get("enable_multipath", None)] += 1
+
+            # ALPN
+            alpn = value.get("alpn")
+            if alpn is None:
+                alpn = "<none>"
+            result["alpn_counts"][alpn] += 1
+
+            # peer_close / local_close error codes
+            peer_close = value.get("peer_close")
+            if isinstance(peer_close, str) and "error_code=" in peer_close:
+                m = ERROR_CODE_RE.search(peer_close)
+                if m:
+                    result["peer_close_error_codes"][int(m.group(1))] += 1
+
+            local_close = value.get("local_close")
+            if isinstance(local_close, str) and "error_code=" in local_close:
+                m = ERROR_CODE_RE.search(local_close)
+                if m:
+                    result["local_close_error_codes"][int(m.group(1))] += 1
+
+    return result
+
+
 @dataclass
 class RecorderAnalyzer:
+    workers: int = 1
+
     total_records: int = 0
     handshake_ok_counts: Counter = field(default_factory=Counter)
     enable_multipath_counts: Counter = field(default_factory=Counter)
@@ -28,14 +96,27 @@ class RecorderAnalyzer:
             logging.warning("Recorder directory %s does not exist, skipping.", recorder_dir)
             return
 
-        files = sorted(recorder_dir.glob("quic-lab-recorder.jsonl*"))
+        files = list_input_files(recorder_dir, "quic-lab-recorder.jsonl")
         if not files:
             logging.warning("No recorder files found in %s", recorder_dir)
             return
 
-        logging.info("Processing %d recorder files ...", len(files))
-        for path in tqdm(files, desc="Recorder files"):
-            self.process_file(path)
+        logging.info(
+            "Processing %d recorder files with %d workers ...",
+            len(files),
+            self.workers,
+        )
+
+        if self.workers <= 1:
+            for path in tqdm(files, desc="Recorder files"):
+                self.process_file(path)
+        else:
+            n_workers = min(self.workers, len(files))
+            chunksize = max(1, len(files) // (n_workers * 4))
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=share_gz_threads, initargs=(n_workers,)) as ex:
+                results = ex.map(_process_recorder_file, [str(p) for p in files], chunksize=chunksize)
+                for res in tqdm(results, total=len(files), desc="Recorder files"):
+                    self._merge_result(res)
 
         logging.info(
             "Recorder: %d records, %d unique group_ids",
@@ -44,47 +125,18 @@ class RecorderAnalyzer:
         )
 
     def process_file(self, path: Path) -> None:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rec = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                key = rec.get("key")
-                if isinstance(key, str):
-                    self.group_ids.add(key)
-
-                value = rec.get("value") or {}
-                self.total_records += 1
-
-                # handshake_ok
-                self.handshake_ok_counts[value.get("handshake_ok", None)] += 1
-
-                # enable_multipath
-                self.enable_multipath_counts[value.get("enable_multipath", None)] += 1
+        self._merge_result(_process_recorder_file(str(path)))
 
-                # ALPN
-                alpn = value.get("alpn")
-                if alpn is None:
-                    alpn = "<none>"
-                self.alpn_counts[alpn] += 1
+    def _merge_result(self, res: dict) -> None:
+        self.total_records += res.get("total_records", 0)
 
-                # peer_close / local_close error codes
-                peer_close = value.get("peer_close")
-                if isinstance(peer_close, str):
-                    m = ERROR_CODE_RE.search(peer_close)
-                    if m:
-                        self.peer_close_error_codes[int(m.group(1))] += 1
+        self.group_ids.update(res.get("group_ids") or [])
 
-                local_close = value.get("local_close")
-                if isinstance(local_close, str):
-                    m = ERROR_CODE_RE.search(local_close)
-                    if m:
-                        self.local_close_error_codes[int(m.group(1))] += 1
+        self.handshake_ok_counts.update(res.get("handshake_ok_counts") or {})
+        self.enable_multipath_counts.update(res.get("enable_multipath_counts") or {})
+        self.alpn_counts.update(res.get("alpn_counts") or {})
+        self.peer_close_error_codes.update(res.get("peer_close_error_codes") or {})
+        self.local_close_error_codes.update(res.get("local_close_error_codes") or {})
 
     def to_dict(self) -> dict:
         return {
@@ -101,8 +153,7 @@ class RecorderAnalyzer:
         out_dir.mkdir(parents=True, exist_ok=True)
 
         summary_path = out_dir / "recorder_summary.json"
-        with summary_path.open("w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        summary_path.write_bytes(orjson.dumps(self.to_dict(), option=SUMMARY_JSON_OPTIONS))
         logging.info("Wrote recorder summary to %s", summary_path)
 
         self._write_counter_csv(
@@ -122,10 +173,10 @@ class RecorderAnalyzer:
             )
 
     @staticmethod
-    def _write_counter_csv(path: Path, counter: Counter, header: list[str]) -> None:
+    def _write_counter_csv(path: Path, counter: Counter, header: list[str], top_k: Optional[int] = None) -> None:
         if not counter:
             return
-        with path.open("w", encoding="utf-8") as f:
-            f.write(",".join(header) + "\n")
-            for key, count in sorted(counter.items(), key=lambda x: (-x[1], x[0])):
-                f.write(f"{key},{count}\n")
+        lines = [",".join(header)]
+        lines.extend(f"{key},{count}" for key, count in sorted_counts(counter, top_k, by_str=False))
+        lines.append("")
+        path.write_text("\n".join(lines), encoding="utf-8")
@@ -1,102 +1,290 @@
 from __future__ import annotations
 
+import io
+import logging
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union
 
 import matplotlib
 matplotlib.use("Agg")  # non-interactive backend
+matplotlib.rcParams.update({
+    "font.family": "DejaVu Sans",  # the default sans-serif face, without walking the fallback list
+    "text.parse_math": False,  # labels are data (error messages may contain '$'), never mathtext
+    "svg.hashsalt": "quic-lab",  # stable element ids in SVG output
+})
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import text_to_path
+
+try:
+    from fast_histogram import histogram1d  # optional: faster uniform-bin histograms
+except ImportError:
+    histogram1d = None
 
 from recorder_analyzer import RecorderAnalyzer
 from qlog_analyzer import QlogAnalyzer
 from log_analyzer import LogAnalyzer
 
 
+def _bin_indices(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Bin index of each value for uniform 'edges', assigned exactly as np.histogram does (last bin closed)."""
+    bins = len(edges) - 1
+    lo, hi = edges[0], edges[-1]
+    # Uniform bins: compute each bin index directly (no searchsorted)
+    idx = np.minimum(((values - lo) * (bins / (hi - lo))).astype(np.intp), bins - 1)
+    # Same edge fix-ups as np.histogram, for values that rounding put one bin off
+    idx[values < edges[idx]] -= 1
+    idx[(values >= edges[idx + 1]) & (idx != bins - 1)] += 1
+    return idx
+
+
+def _weighted_histogram(values: np.ndarray, weights: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (counts, edges) like np.histogram(values, bins, weights=weights): uniform bins over [min, max],
+    last bin closed. Uses fast_histogram when installed, else np.bincount.
+    """
+    lo, hi = float(values.min()), float(values.max())
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    if histogram1d is None:
+        return np.bincount(_bin_indices(values, edges), weights=weights, minlength=bins), edges
+    counts = histogram1d(values, bins=bins, range=(lo, hi), weights=weights)
+    # fast_histogram can only disagree with np.histogram on values within rounding of a bin edge (its range is also
+    # half-open, dropping the maximum): move just those to the bins np.histogram assigns them
+    scaled = (values - lo) * (bins / (hi - lo))
+    near = np.abs(scaled - np.rint(scaled)) < 1e-6
+    if near.any():
+        v, w = values[near], weights[near]
+        counts -= histogram1d(v, bins=bins, range=(lo, hi), weights=w)
+        counts += np.bincount(_bin_indices(v, edges), weights=w, minlength=bins)
+    return counts, edges
+
+
+# Fast zlib level and no Software tag; same pixels and size, slightly larger files
+_SAVE_KWARGS = dict(metadata={"Software": None}, pil_kwargs={"compress_level": 1})
+
+# Margins for numeric (unrotated) x ticks; charts with rotated labels size bottom/left from the labels (_fit_margins).
+# Either way no tight_layout, which lays out and measures every text artist on each chart.
+_MARGINS = dict(left=0.1, right=0.98, top=0.92, bottom=0.12)
+_MAX_BOTTOM_MARGIN = 0.7
+
+# Longer bar labels are shortened for display, keeping head and tail (_short_labels)
+_MAX_LABEL_CHARS = 28
+
+# Output file suffix -> canvas class that writes it
+_Canvas = Union[FigureCanvasAgg, FigureCanvasSVG]
+_CANVASES: Dict[str, Type[_Canvas]] = {".png": FigureCanvasAgg, ".svg": FigureCanvasSVG}
+
+# (figsize, suffix) -> (axes, canvas); one figure per chart size, output format and process, cleared and reused for
+# every chart. Built without pyplot, so saving goes straight to the canvas instead of through the backend dispatch of savefig.
+_FIGURES: Dict[Tuple[Tuple[float, float], str], Tuple[Axes, _Canvas]] = {}
+
+
+@dataclass
+class _BarChart:
+    """One bar chart to render; plain data so it can be sent to a worker process."""
+    out_path: Path
+    x: Any  # tick labels, or left bin edges for histograms
+    heights: Any
+    title: str
+    xlabel: str
+    ylabel: str
+    figsize: Tuple[float, float] = (10, 5)
+    rotation: Optional[int] = 45  # x tick label rotation; None keeps numeric ticks as they are
+    width: Any = 0.8
+    align: Literal["center", "edge"] = "center"
+    x_range: Optional[Tuple[float, float]] = None  # x data range to autoscale over even where no bar is drawn
+
+
+def _short_labels(labels: List[str]) -> List[str]:
+    """
+    Labels longer than _MAX_LABEL_CHARS with their middle replaced by an ellipsis, so that both the prefix
+    (event category, error kind) and the suffix (event name, error code) stay visible.
+    Labels whose shortened form would collide with another label are kept in full.
+    """
+    head = (_MAX_LABEL_CHARS - 1) // 2
+    tail = _MAX_LABEL_CHARS - 1 - head
+    short = [
+        label if len(label) <= _MAX_LABEL_CHARS else label[:head] + "…" + label[-tail:]
+        for label in labels
+    ]
+    counts = Counter(short)
+    return [s if counts[s] == 1 else label for s, label in zip(short, labels)]
+
+
+def _text_extent(text: str, prop: FontProperties) -> Tuple[float, float]:
+    """Width and line height in points of a single-line text, at least as tall as matplotlib's own text boxes"""
+    w, h, d = text_to_path.get_text_width_height_descent(text, prop, ismath=False)
+    _, lp_h, lp_d = text_to_path.get_text_width_height_descent("lp", prop, ismath=False)
+    return w, max(h, lp_h) + max(d, lp_d)
+
+
+def _fit_margins(fig: Figure, chart: _BarChart, rotation: int) -> Dict[str, float]:
+    """
+    Margins that fit chart's tick labels, rotated by 'rotation' degrees and right-aligned at bars 0..n-1,
+    and its x axis label, from the measured label extents.
+    """
+    rc = matplotlib.rcParams
+    fig_w, fig_h = fig.get_size_inches()
+    tick_prop = FontProperties(size=rc["xtick.labelsize"])
+    sin_r, cos_r = math.sin(math.radians(rotation)), math.cos(math.radians(rotation))
+
+    # Extents in points of each rotated label: below the tick, and to the left of it
+    below, left_of = [], []
+    for label in chart.x:
+        w, h = _text_extent(label, tick_prop)
+        below.append(w * sin_r + h * cos_r)
+        left_of.append(w * cos_r + h * sin_r)
+
+    pad = 6.0
+    bottom_pt = rc["xtick.major.size"] + rc["xtick.major.pad"] + max(below, default=0.0) + pad
+    if chart.xlabel:
+        bottom_pt += rc["axes.labelpad"] + _text_extent(chart.xlabel, FontProperties(size=rc["axes.labelsize"]))[1]
+    bottom = min(bottom_pt / 72 / fig_h, _MAX_BOTTOM_MARGIN)
+
+    # Left margin: the first labels reach left of their bars; x position of bar i as an axes fraction follows the
+    # autoscaled limits (bar edges plus axes.xmargin on each side)
+    right = _MARGINS["right"]
+    left = _MARGINS["left"]
+    n = len(chart.x)
+    span = (n - 1) + chart.width
+    total = span * (1 + 2 * rc["axes.xmargin"])
+    for i, ext_pt in enumerate(left_of):
+        frac = (i + chart.width / 2 + rc["axes.xmargin"] * span) / total
+        if frac >= 1:
+            break
+        need = (pad + ext_pt) / 72 - fig_w * right * frac
+        left = max(left, need / (fig_w * (1 - frac)))
+    return dict(_MARGINS, left=left, bottom=bottom)
+
+
+def _render_bar(chart: _BarChart) -> bytes:
+    """Draw 'chart' and return it encoded as chart.out_path's suffix says (PNG or SVG); the caller writes the file."""
+    suffix = chart.out_path.suffix
+    entry = _FIGURES.get((chart.figsize, suffix))
+    if entry is None:
+        fig = Figure(figsize=chart.figsize)
+        entry = _FIGURES[(chart.figsize, suffix)] = (fig.add_subplot(), _CANVASES[suffix](fig))
+    ax, canvas = entry
+    fig = canvas.figure
+
+    ax.clear()
+    if chart.rotation is None:
+        ax.bar(chart.x, chart.heights, width=chart.width, align=chart.align)
+        if chart.x_range is not None:
+            ax.update_datalim([(chart.x_range[0], 0), (chart.x_range[1], 0)])
+    else:
+        # Bars at 0..n-1 with explicit tick labels (what a categorical axis does, minus the unit conversion);
+        # labels that are equal after truncation still get a bar each
+        positions = range(len(chart.x))
+        ax.bar(positions, chart.heights, width=chart.width, align=chart.align)
+        ax.set_xticks(positions, chart.x, rotation=chart.rotation, ha="right")
+    ax.set_xlabel(chart.xlabel)
+    ax.set_ylabel(chart.ylabel)
+    ax.set_title(chart.title)
+    if chart.rotation is None:
+        fig.subplots_adjust(**_MARGINS)
+    else:
+        fig.subplots_adjust(**_fit_margins(fig, chart, chart.rotation))
+    buf = io.BytesIO()
+    if isinstance(canvas, FigureCanvasSVG):
+        canvas.print_svg(buf, metadata={"Date": None})  # no timestamp; with the fixed hash salt reruns are identical
+    else:
+        canvas.print_png(buf, **_SAVE_KWARGS)
+    return buf.getvalue()
+
+
 class Visualizer:
-    def __init__(self, out_dir: Path) -> None:
+    """
+    The plot_* methods only queue charts; flush() renders them, in 'workers' processes when workers > 1.
+    Call close() when done to release the cached figures.
+    """
+
+    def __init__(self, out_dir: Path, workers: int = 1, fmt: str = "png") -> None:
         self.out_dir = out_dir
+        self.workers = workers
+        self.fmt = fmt  # "png" (Agg raster) or "svg" (vector, no rasterization or zlib)
+        self._jobs: List[_BarChart] = []
+
+    def flush(self) -> None:
+        jobs, self._jobs = self._jobs, []
+        if not jobs:
+            return
+
+        logging.info("Rendering %d plots with %d workers ...", len(jobs), self.workers)
+
+        # Files are written on background threads, overlapping with rendering the next chart
+        with ThreadPoolExecutor(max_workers=2) as io_pool:
+            pending = []
+            if self.workers <= 1 or len(jobs) == 1:
+                for job in jobs:
+                    pending.append(io_pool.submit(job.out_path.write_bytes, _render_bar(job)))
+            else:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as ex:
+                    for job, data in zip(jobs, ex.map(_render_bar, jobs)):
+                        pending.append(io_pool.submit(job.out_path.write_bytes, data))
+            for fut in pending:
+                fut.result()  # re-raise write errors
+
+    def close(self) -> None:
+        _FIGURES.clear()
+
+    # Counter bar charts: (analyzer attribute, title, xlabel, ylabel, file name without suffix, top_n)
+    _RECORDER_SPECS = (
+        ("handshake_ok_counts", "Handshake success vs failure", "handshake_ok", "connections", "recorder_handshake_ok", None),
+        ("alpn_counts", "ALPN distribution", "ALPN", "connections", "recorder_alpn", None),
+        ("peer_close_error_codes", "Peer close error codes", "error_code", "connections", "recorder_peer_close_error_codes", 20),
+        ("local_close_error_codes", "Local close error codes", "error_code", "connections", "recorder_local_close_error_codes", 20),
+    )
+    _QLOG_SPECS = (
+        ("event_name_counts", "QLOG event names (top 20)", "event_name", "count", "qlog_event_names_top20", 20),
+        ("frame_type_counts", "QLOG frame types (top 20)", "frame_type", "count", "qlog_frame_types_top20", 20),
+    )
+    _LOG_SPECS = (
+        ("dns_error_counts", "DNS error messages (top 10)", "error_message", "count", "logs_dns_errors_top10", 10),
+        ("connect_error_counts", "Connect error messages (top 10)", "error_message", "count", "logs_connect_errors_top10", 10),
+    )
 
     # ------------- Recorder -------------
 
     def plot_recorder(self, rec: RecorderAnalyzer) -> None:
         if rec.total_records == 0:
             return
-
-        self._bar_from_counter(
-            rec.handshake_ok_counts,
-            "Handshake success vs failure",
-            "handshake_ok",
-            "connections",
-            self.out_dir / "recorder_handshake_ok.png",
-            )
-        self._bar_from_counter(
-            rec.alpn_counts,
-            "ALPN distribution",
-            "ALPN",
-            "connections",
-            self.out_dir / "recorder_alpn.png",
-            )
-        self._bar_from_counter(
-            rec.peer_close_error_codes,
-            "Peer close error codes",
-            "error_code",
-            "connections",
-            self.out_dir / "recorder_peer_close_error_codes.png",
-            top_n=20,
-            )
-        self._bar_from_counter(
-            rec.local_close_error_codes,
-            "Local close error codes",
-            "error_code",
-            "connections",
-            self.out_dir / "recorder_local_close_error_codes.png",
-            top_n=20,
-            )
+        self._plot_counters(rec, self._RECORDER_SPECS)
 
     # ------------- QLOG -------------
 
     def plot_qlog(self, qlog: QlogAnalyzer) -> None:
         if qlog.total_events == 0:
             return
-
-        self._bar_from_counter(
-            qlog.event_name_counts,
-            "QLOG event names (top 20)",
-            "event_name",
-            "count",
-            self.out_dir / "qlog_event_names_top20.png",
-            top_n=20,
-            )
-        self._bar_from_counter(
-            qlog.frame_type_counts,
-            "QLOG frame types (top 20)",
-            "frame_type",
-            "count",
-            self.out_dir / "qlog_frame_types_top20.png",
-            top_n=20,
-            )
+        self._plot_counters(qlog, self._QLOG_SPECS)
 
         # Packet types by direction
         if qlog.packet_type_counts:
-            rows = []
+            by_direction: Dict[str, List[Tuple[Any, int]]] = {}
             for (direction, pkt_type), count in qlog.packet_type_counts.items():
-                rows.append({"direction": direction, "packet_type": pkt_type, "count": count})
-            df = pd.DataFrame(rows)
-            for direction, sub in df.groupby("direction"):
-                sub_sorted = sub.sort_values("count", ascending=False).head(20)
-                plt.figure(figsize=(10, 5))
-                plt.bar(sub_sorted["packet_type"].astype(str), sub_sorted["count"])
-                plt.xticks(rotation=45, ha="right")
-                plt.tight_layout()
-                plt.title(f"Packet types ({direction})")
-                plt.xlabel("packet_type")
-                plt.ylabel("count")
-                out_path = self.out_dir / f"qlog_packet_types_{direction}_top20.png"
-                plt.savefig(out_path)
-                plt.close()
+                by_direction.setdefault(direction, []).append((pkt_type, count))
+            for direction, pairs in by_direction.items():
+                pairs.sort(key=lambda x: -x[1])
+                pairs = pairs[:20]
+                self._jobs.append(_BarChart(
+                    self._out_path(f"qlog_packet_types_{direction}_top20"),
+                    [str(pkt_type) for pkt_type, _ in pairs],
+                    np.fromiter((count for _, count in pairs), dtype=np.int64, count=len(pairs)),
+                    f"Packet types ({direction})",
+                    "packet_type",
+                    "count",
+                ))
 
         # Selected numeric transport params
         for param in ("max_idle_timeout", "initial_max_data"):
@@ -116,41 +304,32 @@ class Visualizer:
             if not numeric:
                 continue
 
-            values = np.array(list(numeric.keys()), dtype=float)
-            weights = np.array(list(numeric.values()), dtype=float)
+            values = np.fromiter(numeric.keys(), dtype=np.float64, count=len(numeric))
+            weights = np.fromiter(numeric.values(), dtype=np.float64, count=len(numeric))
 
-            plt.figure(figsize=(10, 5))
-            plt.hist(values, bins=50, weights=weights)
-            plt.title(f"Distribution of {param}")
-            plt.xlabel(param)
-            plt.ylabel("connections")
-            plt.tight_layout()
-            out_path = self.out_dir / f"qlog_param_{param}_hist.png"
-            plt.savefig(out_path)
-            plt.close()
+            counts, edges = _weighted_histogram(values, weights, bins=50)
+            # Parameter values cluster in a few bins; drawing only the non-empty ones saves a Rectangle per empty bin.
+            # x_range keeps the axis over all bins (a single distinct value sits in a middle bin of a +-0.5 range).
+            filled = np.flatnonzero(counts)
+            self._jobs.append(_BarChart(
+                self._out_path(f"qlog_param_{param}_hist"),
+                edges[:-1][filled],
+                counts[filled],
+                f"Distribution of {param}",
+                param,
+                "connections",
+                rotation=None,
+                width=np.diff(edges)[filled],
+                align="edge",
+                x_range=(edges[0], edges[-1]),
+            ))
 
     # ------------- Logs -------------
 
     def plot_logs(self, logs: LogAnalyzer) -> None:
         if not logs.error_counts:
             return
-
-        self._bar_from_counter(
-            logs.dns_error_counts,
-            "DNS error messages (top 10)",
-            "error_message",
-            "count",
-            self.out_dir / "logs_dns_errors_top10.png",
-            top_n=10,
-            )
-        self._bar_from_counter(
-            logs.connect_error_counts,
-            "Connect error messages (top 10)",
-            "error_message",
-            "count",
-            self.out_dir / "logs_connect_errors_top10.png",
-            top_n=10,
-            )
+        self._plot_counters(logs, self._LOG_SPECS)
 
     # ------------- Cross summary -------------
 
@@ -164,19 +343,27 @@ class Visualizer:
             "group_ids_only_recorder",
             "group_ids_only_qlog",
         ]
-        values = [cross_summary.get(k, 0) for k in labels]
-        plt.figure(figsize=(8, 5))
-        plt.bar(labels, values)
-        plt.xticks(rotation=30, ha="right")
-        plt.ylabel("count")
-        plt.title("Group ID overlap (recorder vs qlog)")
-        plt.tight_layout()
-        out_path = self.out_dir / "cross_group_id_overlap.png"
-        plt.savefig(out_path)
-        plt.close()
+        values = np.fromiter((cross_summary.get(k, 0) for k in labels), dtype=np.int64, count=len(labels))
+        self._jobs.append(_BarChart(
+            self._out_path("cross_group_id_overlap"),
+            labels,
+            values,
+            "Group ID overlap (recorder vs qlog)",
+            "",
+            "count",
+            figsize=(8, 5),
+            rotation=30,
+        ))
 
     # ------------- Helpers -------------
 
+    def _plot_counters(self, analyzer: Any, specs: Tuple[Tuple[str, str, str, str, str, Optional[int]], ...]) -> None:
+        for attr, title, xlabel, ylabel, stem, top_n in specs:
+            self._bar_from_counter(getattr(analyzer, attr), title, xlabel, ylabel, self._out_path(stem), top_n)
+
+    def _out_path(self, stem: str) -> Path:
+        return self.out_dir / f"{stem}.{self.fmt}"
+
     def _bar_from_counter(
             self,
             counter,
@@ -188,18 +375,20 @@ class Visualizer:
     ) -> None:
         if not counter:
             return
-        items = sorted(counter.items(), key=lambda x: (-x[1], str(x[0])))
+        if top_n is not None and top_n < len(counter):
+            # Only entries whose count reaches the top_n-th largest can be plotted; find that count in O(n)
+            # and sort just those (ties at the cut-off are still resolved by key below)
+            vals = np.fromiter(counter.values(), dtype=np.int64, count=len(counter))
+            kth = np.partition(vals, len(vals) - top_n)[len(vals) - top_n]
+            keys = list(counter)
+            items = [(keys[i], counter[keys[i]]) for i in np.flatnonzero(vals >= kth).tolist()]
+        else:
+            items = list(counter.items())
+        items.sort(key=lambda x: (-x[1], str(x[0])))
         if top_n is not None:
             items = items[:top_n]
-        labels = [str(k) for k, _ in items]
-        values = [v for _, v in items]
-
-        plt.figure(figsize=(10, 5))
-        plt.bar(labels, values)
-        plt.xticks(rotation=45, ha="right")
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-        plt.title(title)
-        plt.tight_layout()
-        plt.savefig(out_path)
-        plt.close()
+        # Long keys (error messages, hex codes) are shortened for display; the CSVs keep the full keys
+        labels = _short_labels([str(k) for k, _ in items])
+        values = np.fromiter((v for _, v in items), dtype=np.int64, count=len(items))
+
+        self._jobs.append(_BarChart(out_path, labels, values, title, xlabel, ylabel))